@@ -1,40 +1,148 @@
 import asyncio
+import atexit
+import functools
 import hashlib
 import json
 import logging
 import os
+import queue
 import random
 import re
+import signal
+import time
 from datetime import datetime
-from typing import Dict, List, Optional
+from logging.handlers import QueueHandler, QueueListener
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
 
 import aiohttp
-import gspread
-import requests
 from dotenv import load_dotenv
-from google.oauth2.service_account import Credentials
 from playwright.async_api import async_playwright, Page, Browser, BrowserContext
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+if TYPE_CHECKING:
+    import gspread
+
+try:
+    import orjson  # Optional: much faster history (de)serialization
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop  # Optional: faster event loop (not available on Windows)
+except ImportError:
+    uvloop = None
 
 # --- Logging Configuration ---
-# Sets up a professional logging format with timestamps and severity levels
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-    handlers=[
-        logging.StreamHandler()  # Logs to console. Can add FileHandler here to save logs to a file.
-    ]
-)
+# Sets up a professional logging format with timestamps and severity levels.
+# Records are queued and written by a background thread, so the event loop never blocks on console I/O.
+_console_handler = logging.StreamHandler()  # Logs to console. To also save logs to a file, pass a FileHandler to QueueListener(...) below.
+_console_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
+_log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+_log_listener = QueueListener(_log_queue, _console_handler)
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(_log_queue)], format="%(message)s")
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
 # --- Constants & Mappings ---
-SPORT_ICON_MAP = {
+SPORT_ICON_MAP = MappingProxyType({
     '1': 'Soccer', '2': 'Horse Racing', '3': 'Cricket', '5': 'Specials', '7': 'Golf',
     '8': 'Rugby Union', '9': 'Boxing', '10': 'Formula 1', '12': 'Tennis',
     '14': 'Snooker', '15': 'Darts', '16': 'Baseball', '17': 'Ice Hockey',
     '18': 'Basketball', '19': 'Rugby League', '24': 'Speedway', '36': 'Aussie Rules',
     '38': 'Cycling', '78': 'Handball', '83': 'Futsal'
+})
+SPORT_ICON_RE = re.compile(r'/(\d+)\.svg$')
+DECIMAL_COMMA_TABLE = str.maketrans({'.': ','})
+BET365_URL = "https://www.bet365.it/#/HO/"
+# The SPA updates the bet list in place; a full navigation is only repeated every N cycles as a safety net
+PAGE_RENAVIGATE_EVERY = 30
+CONTAINER_SELECTORS = [".pbb-PopularBetsList > div", ".pbb-SuperBetBoost-parent"]
+CONTAINER_SELECTOR = ", ".join(CONTAINER_SELECTORS)
+# Boosted odds render after the container shell; waiting on them ensures the bets are complete before extraction
+BOOSTED_ODDS_SELECTOR = ", ".join(f"{s} .pbb-PopularBet_BoostedOdds" for s in CONTAINER_SELECTORS)
+
+# Extracts every complete boosted bet in a single round-trip. Receives the elements matched by any of
+# the selectors and keeps only those of the first selector that matched, like the original locator loop.
+EXTRACT_BETS_JS = """
+(elements, selectors) => {
+    let containers = [];
+    for (const selector of selectors) {
+        containers = elements.filter(el => el.matches(selector));
+        if (containers.length > 0) break;
+    }
+    const text = (el, sel) => {
+        const node = el.querySelector(sel);
+        return node ? node.innerText.trim() : 'N/A';
+    };
+    const bets = [];
+    for (const el of containers) {
+        if (!el.querySelector('.pbb-SuperBetBoost, .pbb-SuperBoostChevron')) continue;
+        // Core fields first: incomplete containers are dropped before the remaining fields are read
+        const match = text(el, '.pbb-PopularBet_BetLine');
+        const odds_new = text(el, '.pbb-PopularBet_BoostedOdds');
+        if (match === 'N/A' || odds_new === 'N/A') continue;
+        const icon = el.querySelector('img.pbb-PopularBet_Icon');
+        bets.push({
+            sport_src: icon ? icon.getAttribute('src') : null,
+            details: text(el, '.pbb-PopularBet_Text'),
+            match: match,
+            market: text(el, '.pbb-PopularBet_MarketName'),
+            odds_old: text(el, '.pbb-PopularBet_PreviousOdds'),
+            odds_new: odds_new,
+        });
+    }
+    return {found: containers.length, bets: bets};
 }
+"""
+BROWSER_STATE_SAVE_EVERY = 20  # Cycles between browser storage-state snapshots
+HISTORY_SNAPSHOT_EVERY = 50  # Cycles between full history rewrites; changes in between go to the journal
+SHEET_ID_RESYNC_ROWS = 50  # Re-read column A after this many appended rows to correct ID drift
+TELEGRAM_MAX_MESSAGE_LEN = 4096
+NOTIFICATION_SEPARATOR = "\n\n---\n\n"
+
+# Telegram message templates, filled with a bet record via str.format_map
+NEW_BET_TEMPLATE = (
+    "✨ *NEW SUPERQUOTE* ✨\n\n"
+    "⚽ {sport}\n🆚 {match}\n"
+    "📊 {market}\n📝 {details}\n"
+    "📉 {odds_old} ➡ 📈 *{odds_new}*"
+)
+REMOVED_BET_TEMPLATE = (
+    "❌ *SUPERQUOTE ENDED*\n\n"
+    "🆚 {match}\n📉 {odds_old} ➡ {odds_new}"
+)
+
+@functools.lru_cache(maxsize=512)
+def map_src_to_sport(src_url: str) -> str:
+    """Maps a sport icon URL (e.g. '.../1.svg') to its sport name."""
+    match = SPORT_ICON_RE.search(src_url)
+    if not match:
+        return "Unknown"
+    return SPORT_ICON_MAP.get(match.group(1), f"Sport ID {match.group(1)}")
+
+def batch_messages(messages: List[str], limit: int = TELEGRAM_MAX_MESSAGE_LEN) -> List[str]:
+    """Joins notifications into as few Telegram messages as possible, each at most `limit` chars."""
+    batches: List[str] = []
+    for message in messages:
+        if batches and len(batches[-1]) + len(NOTIFICATION_SEPARATOR) + len(message) <= limit:
+            batches[-1] += NOTIFICATION_SEPARATOR + message
+        else:
+            batches.append(message)
+    return batches
+
+def json_loads(data: bytes):
+    """Decodes JSON bytes, using orjson when available."""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps(obj) -> bytes:
+    """Encodes an object as compact, key-sorted UTF-8 JSON, using orjson when available."""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
 
 class SuperquoteBot:
     """
@@ -50,11 +158,25 @@ class SuperquoteBot:
         # State management
         self.active_superquotes: Dict[str, dict] = {}
         self.history: Dict[str, dict] = self._load_history()
+        # Digest of the last persisted snapshot, used to skip no-op rewrites.
+        # Unknown while a journal is pending, since the snapshot file then lags behind memory.
+        self.saved_history_digest = None if os.path.exists(self.history_journal_file) else self._history_snapshot()[1]
+        self.dirty_ids: Set[str] = set()
+        self.cycles_since_snapshot = 0
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
-        self.gs_client: Optional[gspread.Client] = None
+        self.cycles_since_navigation = 0
+        self.cycle_count = 0
+        self.gs_client: Optional["gspread.Client"] = None
         self.spreadsheet = None
+        self.worksheet: Optional["gspread.Worksheet"] = None
+        self.next_row_id: Optional[int] = None
+        self.rows_since_id_sync = 0
+        self.http_session: Optional[aiohttp.ClientSession] = None
+        self.background_tasks: Set[asyncio.Task] = set()
+        self.sheet_queue: Optional[asyncio.Queue] = None
+        self.pending_writes: List[asyncio.Task] = []
 
         # Initialize Google Sheets connection if enabled
         if self.enable_gsheets:
@@ -62,9 +184,15 @@ class SuperquoteBot:
 
     def _validate_config(self):
         """Validates that all required environment variables are set."""
+        # e.g. LOG_LEVEL=DEBUG to also see per-cycle scraping details
+        logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
         self.telegram_token = os.getenv("TELEGRAM_BOT_TOKEN")
-        self.telegram_chat_ids = os.getenv("TELEGRAM_CHAT_IDS", "").split(",")
+        # Normalize once: strip whitespace, drop empty entries and duplicates (order preserved)
+        raw_chat_ids = (chat_id.strip() for chat_id in os.getenv("TELEGRAM_CHAT_IDS", "").split(","))
+        self.telegram_chat_ids = tuple(dict.fromkeys(chat_id for chat_id in raw_chat_ids if chat_id))
         self.history_file = os.getenv("SUPERQUOTE_HISTORY_FILE", "superquote_history.json")
+        self.browser_state_file = os.getenv("BROWSER_STATE_FILE", "bet365_state.json")
+        self.history_journal_file = f"{os.path.splitext(self.history_file)[0]}.journal.jsonl"
         self.healthcheck_url = os.getenv("HEALTHCHECK_URL") # Moved to .env for security
 
         # Google Sheets Config
@@ -75,73 +203,223 @@ class SuperquoteBot:
         # Determine if Sheets should be enabled
         self.enable_gsheets = all([self.gs_creds_file, self.gs_sheet_id, os.path.exists(str(self.gs_creds_file))])
 
-        if not self.telegram_token or not self.telegram_chat_ids[0]:
+        if not self.telegram_token or not self.telegram_chat_ids:
             logger.critical("Missing required Telegram configuration in .env")
             raise ValueError("Invalid Configuration")
+        self.telegram_send_url = f"https://api.telegram.org/bot{self.telegram_token}/sendMessage"
+        logger.info(f"Telegram notifications enabled for {len(self.telegram_chat_ids)} chat(s).")
 
     def _init_google_sheets(self):
         """Authenticates with Google Sheets API."""
         try:
+            # Imported lazily: these pull in large dependency trees and are only needed when Sheets is enabled
+            import gspread
+            from google.oauth2.service_account import Credentials
+
             scopes = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive.file']
             creds = Credentials.from_service_account_file(self.gs_creds_file, scopes=scopes)
             self.gs_client = gspread.authorize(creds)
             self.spreadsheet = self.gs_client.open_by_key(self.gs_sheet_id)
             logger.info(f"Connected to Google Spreadsheet: {self.spreadsheet.title}")
+            # Resolve the worksheet once; looking it up by name is an API call
+            try:
+                self.worksheet = self.spreadsheet.worksheet(self.gs_worksheet_name)
+            except gspread.exceptions.WorksheetNotFound:
+                logger.error(f"Worksheet '{self.gs_worksheet_name}' not found. Google Sheets disabled.")
+                self.enable_gsheets = False
         except Exception as e:
             logger.error(f"Failed to connect to Google Sheets: {e}")
             self.enable_gsheets = False
 
     def _load_history(self) -> dict:
-        """Loads historical data from JSON file."""
+        """Loads historical data from the JSON snapshot, replaying any journaled changes on top."""
+        data = {}
         if os.path.exists(self.history_file):
             try:
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # Filter only currently active bets from history
-                    self.active_superquotes = {k: v for k, v in data.items() if v.get('active') is True}
-                    logger.info(f"Loaded {len(data)} historical records ({len(self.active_superquotes)} active).")
-                    return data
+                with open(self.history_file, 'rb') as f:
+                    data = json_loads(f.read())
             except json.JSONDecodeError:
                 logger.warning("History file is corrupted. Starting fresh.")
-        return {}
-
-    def _save_history(self):
-        """Persists historical data to JSON file."""
+        data.update(self._read_history_journal())
+
+        # Re-key records from their stored fields so IDs built by older hash functions are migrated
+        data = {self._generate_id(v): v for v in data.values()}
+        # Filter only currently active bets from history
+        self.active_superquotes = {k: v for k, v in data.items() if v.get('active') is True}
+        if data:
+            logger.info(f"Loaded {len(data)} historical records ({len(self.active_superquotes)} active).")
+        return data
+
+    def _read_history_journal(self) -> Dict[str, dict]:
+        """Reads the records appended to the history journal since the last snapshot."""
+        changes = {}
+        if not os.path.exists(self.history_journal_file):
+            return changes
+        with open(self.history_journal_file, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    changes.update(json_loads(line))
+                except json.JSONDecodeError:
+                    # Typically a partial last line left by a crash mid-write
+                    logger.warning("Skipping corrupted history journal entry.")
+        return changes
+
+    def _history_snapshot(self) -> Tuple[bytes, bytes]:
+        """Serializes the history and returns it together with its digest."""
+        payload = json_dumps(self.history)
+        return payload, hashlib.blake2b(payload, digest_size=16).digest()
+
+    def _save_history(self, snapshot: bool = False):
+        """
+        Persists history changes. Records changed this cycle are appended to the journal;
+        the full snapshot is only rewritten every HISTORY_SNAPSHOT_EVERY cycles or when forced.
+        """
+        self.cycles_since_snapshot += 1
+        if snapshot or self.cycles_since_snapshot >= HISTORY_SNAPSHOT_EVERY:
+            self._write_history_snapshot()
+        else:
+            self._append_history_journal()
+
+    def _append_history_journal(self):
+        """Appends one JSON line per changed record to the history journal."""
+        if not self.dirty_ids:
+            return
+        try:
+            with open(self.history_journal_file, 'ab') as f:
+                f.write(b"".join(json_dumps({bid: self.history[bid]}) + b"\n" for bid in self.dirty_ids))
+            self.dirty_ids.clear()
+        except IOError as e:
+            logger.error(f"Failed to append to history journal: {e}")
+
+    def _write_history_snapshot(self):
+        """Rewrites the full history atomically (skipping unchanged state) and resets the journal."""
+        # Journal this cycle's changes first: a crash before the journal is removed then replays
+        # records that match the new snapshot instead of rolling it back
+        if os.path.exists(self.history_journal_file):
+            self._append_history_journal()
+        payload, digest = self._history_snapshot()
         try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, indent=2, ensure_ascii=False)
+            if digest != self.saved_history_digest:
+                tmp_file = f"{self.history_file}.tmp"
+                # Write to a temp file and swap it in, so a crash never leaves a truncated history
+                with open(tmp_file, 'wb') as f:
+                    f.write(payload)
+                os.replace(tmp_file, self.history_file)
+                self.saved_history_digest = digest
+            # The snapshot now holds every change, so the journal is redundant
+            if os.path.exists(self.history_journal_file):
+                os.remove(self.history_journal_file)
+            self.dirty_ids.clear()
+            self.cycles_since_snapshot = 0
         except IOError as e:
             logger.error(f"Failed to save history: {e}")
 
     def _generate_id(self, info: dict) -> str:
-        """Generates a unique MD5 hash for a bet."""
+        """Generates a unique hash for a bet (SHA-256 truncated to 128 bits)."""
         unique_str = f"{info.get('match')}|{info.get('market')}|{info.get('details')}"
-        return hashlib.md5(unique_str.encode('utf-8')).hexdigest()
+        # Not a security use: lets OpenSSL pick its hardware-accelerated SHA path
+        return hashlib.new('sha256', unique_str.encode('utf-8'), usedforsecurity=False).hexdigest()[:32]
+
+    async def _get_http_session(self) -> aiohttp.ClientSession:
+        """Returns the shared keep-alive HTTP session, creating it on first use."""
+        if self.http_session is None or self.http_session.closed:
+            connector = aiohttp.TCPConnector(limit=32, ttl_dns_cache=300, keepalive_timeout=60)
+            self.http_session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self.http_session
+
+    async def _close_http_session(self):
+        """Closes the shared HTTP session if it was opened."""
+        if self.http_session and not self.http_session.closed:
+            await self.http_session.close()
+        self.http_session = None
+
+    async def _ping_healthcheck(self):
+        """Pings the Healthchecks.io URL to signal the bot is alive."""
+        try:
+            session = await self._get_http_session()
+            async with session.get(self.healthcheck_url, timeout=aiohttp.ClientTimeout(total=5)) as resp:
+                resp.raise_for_status()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Healthcheck ping failed: {e}")
+
+    def _run_in_background(self, coro):
+        """Schedules a fire-and-forget coroutine, keeping a reference until it completes."""
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+
+    async def _post_telegram(self, session: aiohttp.ClientSession, chat_id: str, message: str):
+        """Sends a single Telegram message to one chat."""
+        try:
+            payload = {"chat_id": chat_id, "text": message, "parse_mode": "Markdown"}
+            async with session.post(self.telegram_send_url, data=payload) as resp:
+                if resp.status != 200:
+                    logger.error("Telegram failed for %s: %s", chat_id, resp.status)
+        except Exception as e:
+            logger.error("Telegram connection error: %s", e)
 
     async def _send_telegram(self, message: str):
-        """Sends an async notification to all configured Telegram chats."""
-        url = f"https://api.telegram.org/bot{self.telegram_token}/sendMessage"
-        async with aiohttp.ClientSession() as session:
-            for chat_id in self.telegram_chat_ids:
-                try:
-                    payload = {"chat_id": chat_id.strip(), "text": message, "parse_mode": "Markdown"}
-                    async with session.post(url, data=payload) as resp:
-                        if resp.status != 200:
-                            logger.error(f"Telegram failed for {chat_id}: {resp.status}")
-                except Exception as e:
-                    logger.error(f"Telegram connection error: {e}")
-
-    async def _update_sheet(self, info: dict):
-        """Appends a new row to Google Sheets."""
-        if not self.enable_gsheets or not self.spreadsheet:
+        """Sends an async notification to all configured Telegram chats in parallel."""
+        session = await self._get_http_session()
+        tasks = [self._post_telegram(session, chat_id, message) for chat_id in self.telegram_chat_ids]
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _send_notifications(self, notifications: List[str]):
+        """Sends a cycle's notifications as one Telegram message (split only if it exceeds the length limit)."""
+        for message in batch_messages(notifications):
+            await self._send_telegram(message)
+
+    async def _await_pending_writes(self):
+        """Waits for the writes started by the previous cycle, surfacing any errors."""
+        results = await asyncio.gather(*self.pending_writes, return_exceptions=True)
+        self.pending_writes = []
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Background write failed: {result}")
+
+    async def _update_sheet(self, bets: List[dict]):
+        """Appends all new bets of a cycle to Google Sheets in a single request."""
+        if not bets or not self.enable_gsheets or not self.worksheet:
             return
+        import gspread  # Already loaded by _init_google_sheets; needed for its exception types
 
         try:
-            worksheet = self.spreadsheet.worksheet(self.gs_worksheet_name)
-            # Row format: [ID (auto), Date, Sport, Market, Details, Match, Odds Old, Odds Boost]
-            row_data = [
-                len(worksheet.get_all_values()), # Simple ID
-                datetime.now().strftime("%d/%m/%Y"),
+            try:
+                await self._append_bets(bets)
+            except gspread.exceptions.APIError as e:
+                # gspread addresses ranges by the cached title, which stops parsing once the worksheet is
+                # renamed or deleted; any other error (bad input, quota) is re-raised
+                if "Unable to parse range" not in str(e):
+                    raise
+                # Re-resolving by the stable sheet ID follows a rename; a deleted sheet raises WorksheetNotFound
+                logger.warning("Worksheet title no longer resolves, looking it up again by ID...")
+                self.worksheet = await asyncio.to_thread(self.spreadsheet.get_worksheet_by_id, self.worksheet.id)
+                self.next_row_id = None # Rows are rebuilt with IDs re-read from the resolved sheet
+                await self._append_bets(bets)
+        except gspread.exceptions.WorksheetNotFound:
+            logger.error(f"Google Sheets update failed: worksheet '{self.gs_worksheet_name}' was deleted.")
+        except Exception as e:
+            logger.error(f"Google Sheets update failed: {e}")
+
+    async def _append_bets(self, bets: List[dict]):
+        """Builds the sheet rows for the given bets and appends them to the current worksheet."""
+        worksheet = self.worksheet
+        # Row IDs are tracked in-process; column A is only re-read periodically to correct drift
+        if self.next_row_id is None or self.rows_since_id_sync >= SHEET_ID_RESYNC_ROWS:
+            self.next_row_id = len(await asyncio.to_thread(worksheet.col_values, 1))
+            self.rows_since_id_sync = 0
+        base_id = self.next_row_id
+        today = datetime.now().strftime("%d/%m/%Y")
+        # Row format: [ID (auto), Date, Sport, Market, Details, Match, Odds Old, Odds Boost]
+        rows = [
+            [
+                base_id + i, # Simple ID
+                today,
                 info['sport'],
                 info['market'],
                 info['details'],
@@ -150,167 +428,250 @@ class SuperquoteBot:
                 info['odds_new'],
                 "", "", "", "" # Placeholders for analysis columns
             ]
-            worksheet.append_row(row_data, value_input_option='USER_ENTERED')
-            logger.info(f"Google Sheet updated for: {info['match']}")
-        except Exception as e:
-            logger.error(f"Google Sheets update failed: {e}")
+            for i, info in enumerate(bets)
+        ]
+        # gspread is synchronous: run the HTTP call in a worker thread so the event loop keeps going
+        await asyncio.to_thread(worksheet.append_rows, rows, value_input_option='USER_ENTERED')
+        self.next_row_id += len(rows)
+        self.rows_since_id_sync += len(rows)
+        logger.info(f"Google Sheet updated with {len(rows)} new rows.")
+
+    async def _sheet_writer(self):
+        """Consumes queued row batches so Sheets uploads never hold up the scraping cycle."""
+        while True:
+            bets = await self.sheet_queue.get()
+            try:
+                await self._update_sheet(bets)
+            finally:
+                self.sheet_queue.task_done()
+
+    async def _flush_sheet_queue(self, writer: asyncio.Task):
+        """Gives pending Sheets uploads a bounded time to finish, then stops the writer."""
+        try:
+            await asyncio.wait_for(self.sheet_queue.join(), timeout=30)
+        except asyncio.TimeoutError:
+            logger.warning("Timed out flushing pending Google Sheets rows.")
+        writer.cancel()
 
     async def _setup_browser(self, p):
         """Configures and launches the Playwright browser instance."""
         self.browser = await p.chromium.launch(
             headless=False, # Set to True for production/server environments
-            args=['--no-sandbox', '--disable-gpu', '--window-size=1920,1080']
+            args=[
+                '--no-sandbox', '--disable-gpu', '--window-size=1920,1080',
+                # The scraper only reads text: skip image decoding and non-essential subsystems
+                '--blink-settings=imagesEnabled=false', '--disable-extensions',
+                '--disable-background-networking', '--disable-features=TranslateUI'
+            ]
         )
-        self.context = await self.browser.new_context(
+        context_options = dict(
             user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36',
             viewport={'width': 1920, 'height': 1080}
         )
+        # Restore cookies/localStorage from the last run to skip the SPA's cold bootstrap
+        try:
+            state = self.browser_state_file if os.path.exists(self.browser_state_file) else None
+            self.context = await self.browser.new_context(storage_state=state, **context_options)
+        except Exception as e:
+            logger.warning(f"Saved browser state rejected, starting fresh: {e}")
+            self.context = await self.browser.new_context(**context_options)
         # Evasion technique: mask webdriver property
         await self.context.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         self.page = await self.context.new_page()
 
-    async def _extract_bet_info(self, container) -> dict:
-        """Parses a single HTML container to extract bet details."""
-        info = {
-            "sport": "Unknown", "details": "N/A", "match": "N/A",
-            "market": "N/A", "odds_old": "N/A", "odds_new": "N/A",
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        
-        try:
-            # Extract Sport ID from icon URL
-            icon = container.locator("img.pbb-PopularBet_Icon")
-            if await icon.count() > 0:
-                src = await icon.first.get_attribute("src")
-                match = re.search(r'/(\d+)\.svg$', src or "")
-                if match:
-                    info["sport"] = SPORT_ICON_MAP.get(match.group(1), f"Sport ID {match.group(1)}")
-
-            # Extract Text Details
-            text_el = container.locator(".pbb-PopularBet_Text")
-            if await text_el.count(): info["details"] = (await text_el.first.inner_text()).strip()
+    async def _navigate(self):
+        """Loads the Bet365 home page from scratch."""
+        logger.debug("Navigating to Bet365...")
+        await self.page.goto(BET365_URL, timeout=60000, wait_until="domcontentloaded")
+        self.cycles_since_navigation = 0
 
-            match_el = container.locator(".pbb-PopularBet_BetLine")
-            if await match_el.count(): info["match"] = (await match_el.first.inner_text()).strip()
-
-            market_el = container.locator(".pbb-PopularBet_MarketName")
-            if await market_el.count(): info["market"] = (await market_el.first.inner_text()).strip()
+    async def _save_browser_state(self):
+        """Snapshots cookies and localStorage so the next browser launch can restore them."""
+        if not self.context:
+            return
+        try:
+            await self.context.storage_state(path=self.browser_state_file)
+        except Exception as e:
+            logger.warning(f"Failed to save browser state: {e}")
 
+    async def _close_browser(self):
+        """Closes the browser (which also closes its context and page). Safe to call repeatedly."""
+        browser = self.browser
+        self.page = self.context = self.browser = None
+        if browser and browser.is_connected():
+            try:
+                # Bounded, so a hung Chromium process cannot block shutdown or a restart
+                await asyncio.wait_for(browser.close(), timeout=10)
+            except Exception as e:
+                logger.warning(f"Error while closing browser: {e}")
+
+    def _parse_bet_info(self, raw: dict, timestamp: str) -> dict:
+        """Builds the full bet record from the raw fields of one container returned by EXTRACT_BETS_JS."""
+        return {
+            # Extract Sport ID from icon URL
+            "sport": map_src_to_sport(raw["sport_src"]) if raw.get("sport_src") else "Unknown",
+            "details": raw["details"],
+            "match": raw["match"],
+            "market": raw["market"],
             # Odds (Replace dot with comma for European/Sheet format if needed)
-            old_odds = container.locator(".pbb-PopularBet_PreviousOdds")
-            if await old_odds.count(): info["odds_old"] = (await old_odds.first.inner_text()).strip().replace('.', ',')
-
-            new_odds = container.locator(".pbb-PopularBet_BoostedOdds")
-            if await new_odds.count(): info["odds_new"] = (await new_odds.first.inner_text()).strip().replace('.', ',')
-
-        except Exception as e:
-            logger.warning(f"Error extracting bet info: {e}")
+            "odds_old": raw["odds_old"].translate(DECIMAL_COMMA_TABLE),
+            "odds_new": raw["odds_new"].translate(DECIMAL_COMMA_TABLE),
+            "timestamp": timestamp
+        }
 
-        return info
+    async def _extract_bets(self) -> List[dict]:
+        """
+        Extracts the raw fields of all boosted bets currently shown on the page.
+        Errors propagate: a failed read must not be mistaken for an empty page, which would end every active bet.
+        """
+        containers = self.page.locator(CONTAINER_SELECTOR)
+        result = await containers.evaluate_all(EXTRACT_BETS_JS, CONTAINER_SELECTORS)
+        if result["found"]:
+            logger.debug("Found %d potential bets.", result['found'])
+        return result["bets"]
+
+    async def _run_cycle(self):
+        """Runs one monitoring cycle: scrape, diff against active bets, notify and persist."""
+        cycle_start = time.monotonic()
+        await self._await_pending_writes()
+
+        # Stay on the already loaded SPA; only re-navigate periodically
+        if self.cycles_since_navigation >= PAGE_RENAVIGATE_EVERY:
+            await self._navigate()
+        self.cycles_since_navigation += 1
+
+        # Wait for rendered bet data instead of a fixed pause; an empty page just yields no bets
+        try:
+            await self.page.wait_for_selector(BOOSTED_ODDS_SELECTOR, timeout=15000)
+        except PlaywrightTimeoutError:
+            logger.debug("No boosted odds appeared within 15s.")
+
+        new_bets = []
+        notifications = []
+        cycle_ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        # The ID only depends on match/market/details, so it can be computed from the raw fields
+        current = {self._generate_id(raw): raw for raw in await self._extract_bets()}
+        active_ids = self.active_superquotes.keys()
+        # Lists rather than set differences, so notifications and sheet rows keep page/insertion order
+        new_ids = [bid for bid in current if bid not in active_ids]
+        removed_ids = [bid for bid in active_ids if bid not in current]
+
+        # Known bets only need their last-seen timestamp refreshed
+        for bet_id in current.keys() & active_ids:
+            self.history[bet_id]['timestamp'] = cycle_ts
+            self.history[bet_id]['active'] = True
+            self.dirty_ids.add(bet_id)
+
+        # --- Logic: New Bet Found ---
+        for bet_id in new_ids:
+            data = self._parse_bet_info(current[bet_id], cycle_ts)
+            data['active'] = True
+            logger.info("✨ NEW BET: %s (%s)", data['match'], data['odds_new'])
+
+            notifications.append(NEW_BET_TEMPLATE.format_map(data))
+            new_bets.append(data)
+
+            self.active_superquotes[bet_id] = data
+            self.history[bet_id] = data
+            self.dirty_ids.add(bet_id)
+
+        if new_bets and self.sheet_queue:
+            self.sheet_queue.put_nowait(new_bets)
+
+        # --- Logic: Bet Removed ---
+        for bid in removed_ids:
+            bet = self.active_superquotes.pop(bid)
+            self.history[bid]['active'] = False
+            self.dirty_ids.add(bid)
+            logger.info("❌ BET REMOVED: %s", bet['match'])
+            notifications.append(REMOVED_BET_TEMPLATE.format_map(bet))
+
+        # Sent while the cycle sleeps; the next cycle waits for it first, so messages stay in order
+        if notifications:
+            self.pending_writes.append(asyncio.create_task(self._send_notifications(notifications)))
+
+        # Save and Heartbeat (the ping runs in the background so it never stalls the loop)
+        self._save_history()
+        if self.healthcheck_url:
+            self._run_in_background(self._ping_healthcheck())
+
+        self.cycle_count += 1
+        if self.cycle_count % BROWSER_STATE_SAVE_EVERY == 0:
+            await self._save_browser_state()
+
+        # Wait for next cycle: sleep only the remainder of a jittered target cadence, so slow cycles don't drift
+        target_interval = random.uniform(70, 110)
+        wait_time = max(5.0, target_interval - (time.monotonic() - cycle_start))
+        logger.info("Cycle complete. Sleeping for %.1fs...", wait_time)
+        await asyncio.sleep(wait_time)
 
     async def run(self):
         """Main execution loop."""
         logger.info("Starting SuperquoteBot...")
-        
+
+        # Turn SIGTERM into a task cancellation so the browser and sessions are closed cleanly
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except NotImplementedError:
+            pass # Signal handlers are not supported on Windows
+
+        sheet_writer = None
+        if self.enable_gsheets:
+            self.sheet_queue = asyncio.Queue()
+            sheet_writer = asyncio.create_task(self._sheet_writer())
+
+        try:
+            await self._run_loop()
+        except asyncio.CancelledError:
+            logger.info("Shutdown requested, closing browser...")
+        finally:
+            self._save_history(snapshot=True)
+            try:
+                await asyncio.wait_for(self._await_pending_writes(), timeout=15)
+            except asyncio.TimeoutError:
+                logger.warning("Timed out sending pending notifications.")
+            if sheet_writer:
+                await self._flush_sheet_queue(sheet_writer)
+            await self._close_http_session()
+
+    async def _run_loop(self):
+        """Browser lifecycle and monitoring cycles, with restart on failure."""
         async with async_playwright() as p:
-            attempt = 0
-            while attempt < 5:
-                try:
-                    await self._setup_browser(p)
-                    logger.info("Browser launched successfully.")
-                    attempt = 0 # Reset attempts on success
-
-                    while True:
-                        logger.info("Navigating to Bet365...")
-                        await self.page.goto("https://www.bet365.it/#/HO/", timeout=60000, wait_until="domcontentloaded")
-                        await asyncio.sleep(5) # Allow dynamic content to load
-
-                        # Identify containers
-                        containers = []
-                        for selector in [".pbb-PopularBetsList > div", ".pbb-SuperBetBoost-parent"]:
-                            found = self.page.locator(selector)
-                            if await found.count() > 0:
-                                count = await found.count()
-                                for i in range(count):
-                                    containers.append(found.nth(i))
-                                break # Stop if we found a valid container group
-                        
-                        current_cycle_ids = []
-
-                        if containers:
-                            logger.info(f"Found {len(containers)} potential bets.")
-                            for container in containers:
-                                # Validation: Ensure it's a boost
-                                if await container.locator(".pbb-SuperBetBoost, .pbb-SuperBoostChevron").count() == 0:
-                                    continue
-
-                                data = await self._extract_bet_info(container)
-                                if data['match'] == "N/A" or data['odds_new'] == "N/A":
-                                    continue
-
-                                bet_id = self._generate_id(data)
-                                current_cycle_ids.append(bet_id)
-                                data['active'] = True
-
-                                # --- Logic: New Bet Found ---
-                                if bet_id not in self.active_superquotes:
-                                    logger.info(f"✨ NEW BET: {data['match']} ({data['odds_new']})")
-                                    
-                                    msg = (f"✨ *NEW SUPERQUOTE* ✨\n\n"
-                                           f"⚽ {data['sport']}\n🆚 {data['match']}\n"
-                                           f"📊 {data['market']}\n📝 {data['details']}\n"
-                                           f"📉 {data['odds_old']} ➡ 📈 *{data['odds_new']}*")
-                                    
-                                    await self._send_telegram(msg)
-                                    await self._update_sheet(data)
-                                    
-                                    self.active_superquotes[bet_id] = data
-                                    self.history[bet_id] = data
-                                
-                                # Update timestamp for existing bets
-                                else:
-                                    self.history[bet_id]['timestamp'] = data['timestamp']
-                                    self.history[bet_id]['active'] = True
-
-                        # --- Logic: Bet Removed ---
-                        removed_ids = [bid for bid in self.active_superquotes if bid not in current_cycle_ids]
-                        for bid in removed_ids:
-                            bet = self.active_superquotes.pop(bid)
-                            self.history[bid]['active'] = False
-                            logger.info(f"❌ BET REMOVED: {bet['match']}")
-                            
-                            msg = (f"❌ *SUPERQUOTE ENDED*\n\n"
-                                   f"🆚 {bet['match']}\n📉 {bet['odds_old']} ➡ {bet['odds_new']}")
-                            await self._send_telegram(msg)
-
-                        # Save and Heartbeat
-                        self._save_history()
-                        if self.healthcheck_url:
-                            try:
-                                requests.get(self.healthcheck_url, timeout=10)
-                            except requests.RequestException:
-                                pass
-
-                        # Wait for next cycle
-                        wait_time = random.uniform(70, 110)
-                        logger.info(f"Cycle complete. Sleeping for {wait_time:.1f}s...")
-                        await asyncio.sleep(wait_time)
-
-                except Exception as e:
-                    logger.error(f"Critical Loop Error: {e}")
-                    # Screenshot on error
+            try:
+                attempt = 0
+                while attempt < 5:
                     try:
-                        if self.page: await self.page.screenshot(path=f"error_{datetime.now().timestamp()}.png")
-                    except: pass
-                    
-                    if self.browser: await self.browser.close()
-                    attempt += 1
-                    await asyncio.sleep(30 * attempt)
+                        await self._setup_browser(p)
+                        logger.info("Browser launched successfully.")
+                        attempt = 0 # Reset attempts on success
+                        # Navigation errors are retried indefinitely; only launch failures count as attempts
+                        await self._navigate()
+
+                        while True:
+                            await self._run_cycle()
+
+                    except Exception as e:
+                        logger.error(f"Critical Loop Error: {e}")
+                        # Screenshot on error
+                        try:
+                            if self.page: await self.page.screenshot(path=f"error_{datetime.now().timestamp()}.png")
+                        except: pass
+
+                        await self._close_browser()
+                        attempt += 1
+                        await asyncio.sleep(30 * attempt)
+            finally:
+                await self._save_browser_state()
+                await self._close_browser()
 
 if __name__ == "__main__":
     try:
         bot = SuperquoteBot()
-        asyncio.run(bot.run())
+        if uvloop:
+            uvloop.run(bot.run())
+        else:
+            asyncio.run(bot.run())
     except KeyboardInterrupt:
         logger.info("Bot stopped by user.")
     except Exception as e: